@@ -5,22 +5,92 @@
 # https://github.com/tavily-ai/tavily-mcp
 # https://strandsagents.com/latest/documentation/docs/user-guide/concepts/tools/mcp-tools/#2-streamable-http
 
+from __future__ import annotations
+
+import asyncio
 import atexit
+import copy
+import functools
+import hashlib
+import json
 import logging
 import os
+import re
 import readline  # Add readline for proper terminal input handling
 import signal
 import sys
-from dataclasses import dataclass
-from typing import Any, Optional, Set, TypedDict, Union
+import termios
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+import httpx
+import numpy as np
+import ollama
+
+if TYPE_CHECKING:
+    from strands import Agent
+    from strands.agent.agent_result import AgentResult
+    from strands.hooks import AfterToolCallEvent, BeforeToolCallEvent
+    from strands.models.ollama import OllamaModel
+    from strands.tools.mcp.mcp_agent_tool import MCPAgentTool
+    from strands.tools.mcp.mcp_client import MCPClient
+
+T = TypeVar("T")
+
+
+# Import Strands, MCP, and the Strands tools on first use
+@functools.cache
+def _imports() -> SimpleNamespace:
+    """Import the agent's heavy dependencies.
+
+    Importing Strands, the MCP client, and the Strands tools takes seconds, so
+    they are imported on first use rather than at startup. A configuration
+    error, such as a missing API key, is then reported without the wait.
 
-from dotenv import load_dotenv
-from mcp.client.streamable_http import streamablehttp_client
-from strands import Agent
-from strands.agent.conversation_manager import SlidingWindowConversationManager
-from strands.models.ollama import OllamaModel
-from strands.tools.mcp.mcp_client import MCPClient
-from strands_tools import current_time, shell
+    Returns:
+        Namespace of the imported classes, functions, and tools
+    """
+    from mcp.client.streamable_http import streamablehttp_client
+    from mcp.types import Tool as MCPTool
+    from strands import Agent
+    from strands.agent.conversation_manager import NullConversationManager
+    from strands.hooks import AfterToolCallEvent, BeforeToolCallEvent
+    from strands.models.ollama import OllamaModel
+    from strands.tools.mcp.mcp_agent_tool import MCPAgentTool
+    from strands.tools.mcp.mcp_client import MCPClient
+    from strands.tools.registry import ToolRegistry
+    from strands.types.exceptions import ContextWindowOverflowException
+    from strands_tools import current_time, shell
+
+    return SimpleNamespace(
+        Agent=Agent,
+        AfterToolCallEvent=AfterToolCallEvent,
+        BeforeToolCallEvent=BeforeToolCallEvent,
+        ContextWindowOverflowException=ContextWindowOverflowException,
+        MCPAgentTool=MCPAgentTool,
+        MCPClient=MCPClient,
+        MCPTool=MCPTool,
+        NullConversationManager=NullConversationManager,
+        OllamaModel=OllamaModel,
+        ToolRegistry=ToolRegistry,
+        current_time=current_time,
+        shell=shell,
+        streamablehttp_client=streamablehttp_client,
+    )
 
 
 # Terminal colors using dataclass for more pythonic code
@@ -35,6 +105,47 @@ class TermColors:
     RESET: str = "\033[0m"
 
 
+# Intern the color codes, which are reused in every line of terminal output
+for _color in ("RED", "GREEN", "BLUE", "YELLOW", "RESET"):
+    setattr(TermColors, _color, sys.intern(getattr(TermColors, _color)))
+
+
+# Terminal output formatted once at import rather than on every turn
+WELCOME_STR = (
+    f"{TermColors.BLUE}Welcome to the Tavily MCP Server Search Agent!{TermColors.RESET}\n"
+    f"{TermColors.BLUE}Type 'exit' or 'quit' to end the session.{TermColors.RESET}\n"
+)
+PROMPT_STR = f"\n{TermColors.BLUE}> {TermColors.RESET}"
+GOODBYE_STR = f"\n{TermColors.BLUE}Goodbye! 👋{TermColors.RESET}\n"
+INTERRUPTED_STR = (
+    f"\n\n{TermColors.YELLOW}Execution interrupted. Exiting...{TermColors.RESET}\n"
+)
+RESPONSE_START = f"\n{TermColors.GREEN}"
+RESPONSE_END = f"{TermColors.RESET}\n"
+ERROR_PREFIX = f"\n{TermColors.RED}"
+CONNECTION_HINT_STR = (
+    f"{TermColors.RESET}\n"
+    f"{TermColors.RED}Check if Ollama is running and try again.{TermColors.RESET}\n"
+)
+VALUE_HINT_STR = (
+    f"{TermColors.RESET}\n"
+    f"{TermColors.RED}Please check your input and try again.{TermColors.RESET}\n"
+)
+UNEXPECTED_HINT_STR = (
+    f"{TermColors.RESET}\n"
+    f"{TermColors.RED}Please try a different request.{TermColors.RESET}\n"
+)
+
+
+# Tavily MCP server and the on-disk cache of its tool list
+TAVILY_MCP_URL = "https://mcp.tavily.com/mcp/"
+TOOLS_CACHE_FILE = os.path.expanduser("~/.search_agent_tools.json")
+TOOLS_CACHE_TTL = 24 * 60 * 60  # seconds
+
+# Maximum number of lines kept in the readline history file
+HISTORY_LENGTH = 1000
+
+
 # Set up basic logging configuration
 def setup_logging(log_level: str = "WARNING") -> logging.Logger:
     """Configure logging with the specified log level.
@@ -55,53 +166,84 @@ def setup_logging(log_level: str = "WARNING") -> logging.Logger:
     return logging.getLogger(__name__)
 
 
-# Define a TypedDict for environment variables
-class EnvVars(TypedDict):
+# Define an immutable dataclass for environment variables
+@dataclass(frozen=True, slots=True)
+class EnvVars:
+    """Validated environment variables."""
+
     MODEL_ID: str
     TEMPERATURE: float
-    TAVILY_API_KEY: str
+    TAVILY_API_KEY: str = field(repr=False)
     OLLAMA_HOST: str
     KEEP_ALIVE: str
+    EMBED_MODEL_ID: str
+    TOOL_TOP_K: int
+    CONV_WINDOW_SIZE: int
+    CONV_TOKEN_BUDGET: int
+    NUM_CTX: int
+    NUM_BATCH: int
 
 
-# Load environment variables with validation
+# Load environment variables with validation, once per process
+@functools.cache
 def load_environment_variables() -> EnvVars:
     """Load and validate required environment variables.
 
+    The result is cached, so later calls skip re-reading the .env file.
+
     Returns:
-        Dictionary containing environment variables
+        Immutable EnvVars instance
 
     Raises:
         ValueError: If required environment variables are missing
     """
+    from dotenv import load_dotenv
+
     load_dotenv()
 
     # Define defaults and type conversion functions
-    model_id = os.getenv("MODEL_ID", "qwen3:14b")
+    # A Q4_K_M quantized model needs about a third of the memory of FP16 and
+    # runs about twice as fast, with little loss in quality for tool use
+    model_id = os.getenv("MODEL_ID", "qwen3:14b-q4_K_M")
     temperature = float(os.getenv("TEMPERATURE", "0.2"))
     tavily_api_key = os.getenv("TAVILY_API_KEY")
     ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
     keep_alive = os.getenv("KEEP_ALIVE", "10m")
+    embed_model_id = os.getenv("EMBED_MODEL_ID", "nomic-embed-text")
+    tool_top_k = int(os.getenv("TOOL_TOP_K", "3"))
+    conv_window_size = int(os.getenv("CONV_WINDOW_SIZE", "8"))
+    conv_token_budget = int(os.getenv("CONV_TOKEN_BUDGET", "4096"))
+    num_ctx = int(os.getenv("NUM_CTX", "8192"))
+    num_batch = int(os.getenv("NUM_BATCH", "512"))
 
     # Validate required environment variables
     if not tavily_api_key:
         raise ValueError("TAVILY_API_KEY environment variable is required")
 
-    # Create properly typed dictionary
-    env_vars: EnvVars = {
-        "MODEL_ID": model_id,
-        "TEMPERATURE": temperature,
-        "TAVILY_API_KEY": tavily_api_key,
-        "OLLAMA_HOST": ollama_host,
-        "KEEP_ALIVE": keep_alive,
-    }
-
-    return env_vars
+    return EnvVars(
+        MODEL_ID=model_id,
+        TEMPERATURE=temperature,
+        TAVILY_API_KEY=tavily_api_key,
+        OLLAMA_HOST=ollama_host,
+        KEEP_ALIVE=keep_alive,
+        EMBED_MODEL_ID=embed_model_id,
+        TOOL_TOP_K=tool_top_k,
+        CONV_WINDOW_SIZE=conv_window_size,
+        CONV_TOKEN_BUDGET=conv_token_budget,
+        NUM_CTX=num_ctx,
+        NUM_BATCH=num_batch,
+    )
 
 
 # Initialize the model
 def initialize_model(
-    model_id: str, temperature: float, host: str, keep_alive: str
+    model_id: str,
+    temperature: float,
+    host: str,
+    keep_alive: str,
+    num_ctx: int = 8192,
+    num_batch: int = 512,
+    transport: Optional[httpx.AsyncHTTPTransport] = None,
 ) -> OllamaModel:
     """Initialize the Ollama model with the specified parameters.
 
@@ -110,18 +252,88 @@ def initialize_model(
         temperature: Temperature parameter for generation
         host: Ollama host URL
         keep_alive: Keep-alive duration
+        num_ctx: Context window size, in tokens
+        num_batch: Prompt processing batch size, in tokens
+        transport: Shared HTTP transport for requests to Ollama, if any
 
     Returns:
         Configured OllamaModel instance
     """
-    return OllamaModel(
+    model: OllamaModel = _imports().OllamaModel(
         model_id=model_id,
         temperature=temperature,
         host=host,
         keep_alive=keep_alive,
+        options={"num_ctx": num_ctx, "num_batch": num_batch},
+        ollama_client_args={"transport": transport} if transport else None,
+    )
+    return model
+
+
+# Create the HTTP transport shared by all requests to Ollama
+def create_ollama_transport(
+    max_keepalive_connections: int = 32,
+) -> httpx.AsyncHTTPTransport:
+    """Create a pooled HTTP transport for requests to Ollama.
+
+    Strands creates a new Ollama client for every model call. Passing each
+    client the same transport lets them all reuse its keep-alive connections
+    instead of opening a new connection per call.
+
+    Args:
+        max_keepalive_connections: Maximum number of idle connections to keep open
+
+    Returns:
+        Configured AsyncHTTPTransport instance
+    """
+    return httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(max_keepalive_connections=max_keepalive_connections)
     )
 
 
+# Warm up the model in the background
+def warmup_model(
+    model: OllamaModel, host: str, logger: logging.Logger
+) -> threading.Thread:
+    """Load the model into memory so the first prompt avoids the cold start.
+
+    An empty generate request loads the model's weights and keeps them loaded
+    for the keep-alive duration. It runs on a daemon thread so the prompt
+    appears immediately while the weights load.
+
+    Args:
+        model: Configured OllamaModel instance
+        host: Ollama host URL
+        logger: Logger instance for logging
+
+    Returns:
+        Started warm-up thread
+    """
+    model_id = model.config["model_id"]
+    payload = {
+        "model": model_id,
+        "prompt": "",
+        "keep_alive": model.config.get("keep_alive"),
+        # Load with the same options as the agent, or Ollama reloads the model
+        "options": model.config.get("options"),
+        "stream": False,
+    }
+
+    def load() -> None:
+        try:
+            response = httpx.post(
+                f"{host.rstrip('/')}/api/generate", json=payload, timeout=600
+            )
+            response.raise_for_status()
+            logger.info("Model %s loaded", model_id)
+        except httpx.HTTPError as e:
+            logger.warning("Model warm-up failed: %s", e)
+
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    return thread
+
+
 # Initialize the MCP client for Tavily
 def initialize_mcp_client(api_key: str) -> MCPClient:
     """Initialize the MCP client for Tavily.
@@ -132,29 +344,177 @@ def initialize_mcp_client(api_key: str) -> MCPClient:
     Returns:
         Configured MCPClient instance
     """
-    return MCPClient(
-        lambda: streamablehttp_client(
-            f"https://mcp.tavily.com/mcp/?tavilyApiKey={api_key}"
-        )
+    lib = _imports()
+    client: MCPClient = lib.MCPClient(
+        lambda: lib.streamablehttp_client(f"{TAVILY_MCP_URL}?tavilyApiKey={api_key}")
     )
+    return client
+
+
+# Content kept in place of tool results condensed out of earlier turns
+_CONDENSED_RESULT = "Tool result omitted from the conversation history."
+
+
+# Conversation manager with a token budget
+@functools.cache
+def token_budget_conversation_manager() -> type:
+    """Define the conversation manager class on first use, once Strands is imported.
+
+    Returns:
+        TokenBudgetConversationManager class
+    """
+    from strands.agent.conversation_manager import SlidingWindowConversationManager
+
+    class TokenBudgetConversationManager(SlidingWindowConversationManager):
+        """Sliding window conversation manager with a secondary token budget.
+
+        A small window bounds the prompt size, and so Ollama's prefill time, per
+        turn. The token budget also trims the history when a few large tool
+        results would otherwise overflow the model's context.
+
+        History is trimmed in whole turns, from one user prompt up to the next,
+        so a question is never separated from its answer and the latest turn is
+        always kept. Over budget, the tool results of earlier turns are
+        condensed before any turn is dropped, since the answers that follow
+        them already summarize the results.
+        """
+
+        def __init__(self, window_size: int = 8, token_budget: int = 4096):
+            # Trim whole turns rather than replacing the latest tool result
+            super().__init__(window_size=window_size, should_truncate_results=False)
+            self.token_budget = token_budget
+
+        @staticmethod
+        def estimate_tokens(messages: Any) -> int:
+            """Estimate the token count of messages at roughly four characters per token.
+
+            Args:
+                messages: Conversation messages
+
+            Returns:
+                Estimated token count
+            """
+            return len(json.dumps(messages, default=str)) // 4
+
+        @staticmethod
+        def turn_starts(messages: Any) -> List[int]:
+            """Find the index of each user prompt that starts a turn.
+
+            Args:
+                messages: Conversation messages
+
+            Returns:
+                Indexes of user messages that are not tool results
+            """
+            return [
+                i
+                for i, message in enumerate(messages)
+                if message["role"] == "user"
+                if not any("toolResult" in content for content in message["content"])
+            ]
+
+        @staticmethod
+        def condense_tool_results(messages: Any) -> bool:
+            """Replace the content of tool results with a short placeholder.
+
+            Args:
+                messages: Conversation messages to condense in place
+
+            Returns:
+                True if any tool result was condensed
+            """
+            condensed = False
+            for message in messages:
+                for content in message["content"]:
+                    result = content.get("toolResult")
+                    condensed_content = [{"text": _CONDENSED_RESULT}]
+                    if result is not None and result["content"] != condensed_content:
+                        result["content"] = condensed_content
+                        condensed = True
+            return condensed
+
+        def apply_management(self, agent: Agent, **kwargs: Any) -> None:
+            """Trim the oldest turns until the history fits the window and budget.
+
+            Args:
+                agent: The agent whose messages will be managed
+                **kwargs: Additional keyword arguments
+            """
+            messages = agent.messages
+            while True:
+                over_budget = self.estimate_tokens(messages) > self.token_budget
+                if len(messages) <= self.window_size and not over_budget:
+                    return
+
+                starts = [i for i in self.turn_starts(messages) if i > 0]
+                latest = starts[-1] if starts else 0
+                if over_budget and self.condense_tool_results(messages[:latest]):
+                    continue
+                if not starts:
+                    # Only the latest turn is left
+                    return
+
+                self.removed_message_count += starts[0]
+                del messages[: starts[0]]
+
+    return TokenBudgetConversationManager
+
+
+# Commands that end the session
+_EXIT_COMMANDS: frozenset[str] = frozenset({"exit", "quit", "q", "bye"})
 
 
 # Process user input
-def process_input(user_input: str) -> Union[bool, str]:
+def process_input(user_input: str) -> Optional[str]:
     """Process user input and check for exit commands.
 
     Args:
         user_input: User's input string
 
     Returns:
-        False if user wants to exit, otherwise the processed input
+        None if user wants to exit, otherwise the processed input
     """
-    # Strip whitespace
+    # Strip whitespace, then check for exit commands
     cleaned_input = user_input.strip()
+    return None if cleaned_input.lower() in _EXIT_COMMANDS else cleaned_input
+
+
+# Pattern used to split compound input into sub-queries
+_NUMBERED_ITEM_RE = re.compile(r"(?:^|\s)\d+[.)]\s+")
+
+
+# Split compound input into independent sub-queries
+def split_subqueries(text: str) -> List[str]:
+    """Split compound user input into independent sub-queries.
+
+    Input is read one line at a time, so compound input is recognized by a
+    leading numbered list (e.g., "1. ... 2. ..."), which is split into its items.
+
+    Args:
+        text: Processed user input
+
+    Returns:
+        List of sub-queries, or a single-item list if the input is not compound
+    """
+    items = [item.strip() for item in _NUMBERED_ITEM_RE.split(text) if item.strip()]
+    if len(items) > 1 and _NUMBERED_ITEM_RE.match(text):
+        return items
+
+    return [text]
+
 
-    # Check for exit commands (use a set for O(1) lookup)
-    exit_commands: Set[str] = {"exit", "quit", "q", "bye"}
-    return False if cleaned_input.lower() in exit_commands else cleaned_input
+# Tags around the model's thinking content, interned for the streaming hot path
+_THINK_OPEN = sys.intern("<think>")
+_THINK_CLOSE = sys.intern("</think>")
+
+# End of thinking whose opening tag was part of the prompt
+_ORPHAN_CLOSE = sys.intern(_THINK_CLOSE + "\n\n")
+
+# Thinking content: a leading block whose opening tag was part of the prompt,
+# ending in </think> and a blank line, or any complete <think>...</think> block
+_THINK_RE = re.compile(
+    r"^(?:(?!<think>).)*?</think>\n\n\s*|<think>.*?</think>\s*", re.DOTALL
+)
 
 
 # Format agent response
@@ -171,21 +531,170 @@ def format_response(response: Any, logger: logging.Logger) -> str:
     try:
         # Extract the actual response text, removing any thinking content
         response_text = response.message["content"][0]["text"]
-        # Remove the thinking part if it exists (content after </think>)
-        if "</think>" in response_text:
-            return str(response_text.split("</think>\n\n")[-1])
-        return str(response_text)
+        # Remove every thinking block, keeping the content around them
+        return _THINK_RE.sub("", response_text)
     except (KeyError, IndexError) as e:
-        # Use !s formatter for cleaner error representation
-        logger.warning(f"Error formatting response: {e!s}")
+        # Use %s for cleaner error representation
+        logger.warning("Error formatting response: %s", e)
         return "Sorry, I couldn't process that response correctly."
 
 
+# Length of a possible partial thinking tag at the end of the text
+def _partial_tag_length(text: str) -> int:
+    """Find how many trailing characters of the text could start a thinking tag.
+
+    Args:
+        text: Streamed text
+
+    Returns:
+        Length of the longest suffix that is a prefix of <think> or of
+        </think> and a blank line, or 0
+    """
+    for length in range(min(len(text), len(_ORPHAN_CLOSE) - 1), 0, -1):
+        suffix = text[-length:]
+        if _THINK_OPEN.startswith(suffix) or _ORPHAN_CLOSE.startswith(suffix):
+            return length
+    return 0
+
+
+# Stream agent response text to the terminal
+class ResponseStream:
+    """Writes streamed response text to stdout, hiding thinking content.
+
+    Text is written as soon as it is received, except for a possible partial
+    thinking tag at the end of the latest chunk. Like format_response, every
+    <think>...</think> block is dropped once its closing tag arrives. The first
+    line of each message is held back until it is complete, so that a leading
+    block whose opening tag was part of the prompt is also dropped when its
+    closing tag arrives first. The text of each message, such as a note before
+    a tool call and the final answer, is written as a separate paragraph.
+    """
+
+    def __init__(self) -> None:
+        self.started = False
+        self._buffer = ""
+        self._thinking = False
+        self._skip_whitespace = True
+        self._message_started = False
+        self._leading = True
+
+    def write(self, text: str) -> None:
+        """Write a chunk of streamed text.
+
+        Args:
+            text: Text chunk from the model
+        """
+        self._buffer += text
+        if self._leading and not self._drop_leading_block():
+            return
+        while self._buffer:
+            if self._thinking:
+                _, sep, tail = self._buffer.partition(_THINK_CLOSE)
+                if not sep:
+                    return
+                self._thinking = False
+                self._skip_whitespace = True
+                self._buffer = tail
+                continue
+
+            start = self._buffer.find(_THINK_OPEN)
+            close = self._buffer.find(_ORPHAN_CLOSE)
+            if close >= 0 and (start < 0 or close < start):
+                # Drop the closing tag of thinking that was already written,
+                # and start the answer on a new paragraph
+                self._emit(self._buffer[:close])
+                self._skip_whitespace = True
+                self._message_started = False
+                self._buffer = self._buffer[close + len(_ORPHAN_CLOSE) :]
+                continue
+            if start < 0:
+                # Hold back a partial tag until the next chunk
+                end = len(self._buffer) - _partial_tag_length(self._buffer)
+                self._emit(self._buffer[:end])
+                self._buffer = self._buffer[end:]
+                return
+
+            self._emit(self._buffer[:start])
+            self._thinking = True
+            self._buffer = self._buffer[start:]
+
+    def end_message(self) -> None:
+        """Flush held-back text at the end of a message and reset for the next."""
+        if self._buffer:
+            # Like format_response, show an unclosed <think> block as is
+            self._emit(self._buffer)
+        self._buffer = ""
+        self._thinking = False
+        self._skip_whitespace = True
+        self._message_started = False
+        self._leading = True
+
+    def close(self) -> None:
+        """Flush held-back text and end the response's color."""
+        self.end_message()
+        if self.started:
+            sys.stdout.write(RESPONSE_END)
+            sys.stdout.flush()
+
+    def _drop_leading_block(self) -> bool:
+        """Drop a leading thinking block whose opening tag was part of the prompt.
+
+        Returns:
+            False while the start of the message is still held back
+        """
+        start = self._buffer.find(_THINK_OPEN)
+        close = self._buffer.find(_ORPHAN_CLOSE)
+        if close >= 0 and (start < 0 or close < start):
+            self._buffer = self._buffer[close + len(_ORPHAN_CLOSE) :]
+        elif start < 0:
+            # Wait for the first complete line, excluding a partial closing tag
+            end = len(self._buffer) - _partial_tag_length(self._buffer)
+            if "\n" not in self._buffer[:end].lstrip():
+                return False
+        self._leading = False
+        return True
+
+    def _emit(self, text: str) -> None:
+        if self._skip_whitespace:
+            text = text.lstrip()
+            if not text:
+                return
+            self._skip_whitespace = False
+        if not text:
+            return
+        if not self.started:
+            sys.stdout.write(RESPONSE_START)
+            self.started = True
+        elif not self._message_started:
+            # Separate this message's text from the previous message's
+            text = "\n\n" + text
+        self._message_started = True
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
 # Graceful shutdown handler
 def setup_signal_handlers() -> None:
-    """Set up signal handlers for graceful shutdown."""
+    """Set up signal handlers for graceful shutdown.
+
+    Input is read by readline on a background thread, which cannot restore the
+    terminal settings when the session exits mid-read, so they are saved here
+    and restored on exit.
+    """
+    try:
+        terminal_state = termios.tcgetattr(sys.stdin)
+    except (termios.error, ValueError):
+        # Input is not a terminal
+        terminal_state = None
+
+    def restore_terminal() -> None:
+        if terminal_state is not None:
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, terminal_state)
+
+    atexit.register(restore_terminal)
 
     def signal_handler(sig: int, frame: Any) -> None:
+        restore_terminal()
         print(
             f"\n\n{TermColors.YELLOW}Received signal {sig}. Shutting down gracefully...{TermColors.RESET}"
         )
@@ -195,64 +704,747 @@ def setup_signal_handlers() -> None:
     signal.signal(signal.SIGTERM, signal_handler)
 
 
+# Embed texts with Ollama
+async def embed_texts(
+    client: ollama.AsyncClient,
+    model_id: str,
+    texts: List[str],
+    batch_size: int = 32,
+) -> np.ndarray:
+    """Embed texts as unit-length vectors, so dot products are cosine similarities.
+
+    Texts are sent to Ollama's /api/embed endpoint in batches, so N texts take
+    ceil(N / batch_size) requests rather than N.
+
+    Args:
+        client: Ollama client
+        model_id: ID of the embedding model to use
+        texts: Texts to embed
+        batch_size: Maximum number of texts per request
+
+    Returns:
+        (N, d) float32 matrix of embeddings
+    """
+    batches = []
+    for start in range(0, len(texts), batch_size):
+        response = await client.embed(
+            model=model_id, input=texts[start : start + batch_size]
+        )
+        batches.append(np.asarray(response["embeddings"], dtype=np.float32))
+    embeddings = np.concatenate(batches)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.where(norms == 0, 1.0, norms)
+
+
+# Common abbreviations expanded when normalizing queries
+_ABBREVIATIONS = {
+    "what's": "what is",
+    "who's": "who is",
+    "where's": "where is",
+    "how's": "how is",
+    "w/": "with",
+    "w/o": "without",
+    "pls": "please",
+    "info": "information",
+}
+
+# Follow-up prompts whose answers depend on earlier turns
+_FOLLOW_UP_RE = re.compile(
+    r"^(?:and|but|so|also|why|how come|what about|how about|what else"
+    r"|tell me more|more|go on|continue|elaborate|explain)\b"
+    r"|\b(?:it|its|it's|this|that|these|those|they|them|their|he|him|his|she|her"
+    r"|above|previous|earlier)\b"
+)
+
+
+# Cache of agent responses for repeated or similar queries
+class QueryCache:
+    """LRU cache of agent responses keyed by normalized query.
+
+    Exact matches are looked up by key. Near misses are found by cosine
+    similarity between the query's embedding and the embeddings of cached keys.
+    """
+
+    def __init__(
+        self,
+        embed_model_id: str,
+        client: ollama.AsyncClient,
+        logger: logging.Logger,
+        max_size: int = 512,
+        threshold: float = 0.97,
+    ):
+        self.embed_model_id = embed_model_id
+        self.logger = logger
+        self.max_size = max_size
+        self.threshold = threshold
+        self.client = client
+        self.semantic_lookup = True
+        self._entries: OrderedDict[str, Tuple[Optional[np.ndarray], str]] = (
+            OrderedDict()
+        )
+        self._keys: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalize a query into a cache key.
+
+        Args:
+            query: User's query
+
+        Returns:
+            Lowercased query with collapsed whitespace and expanded abbreviations
+        """
+        words = re.sub(r"\s+", " ", query.lower()).strip().split(" ")
+        return " ".join(_ABBREVIATIONS.get(word, word) for word in words)
+
+    @staticmethod
+    def cacheable(key: str) -> bool:
+        """Check whether a query's answer is independent of earlier turns.
+
+        Follow-ups such as "tell me more" or "what about France?" are answered
+        from the conversation, so a cached answer to the same words from
+        another point in the conversation would be wrong.
+
+        Args:
+            key: Normalized query
+
+        Returns:
+            False for queries that refer back to the conversation
+        """
+        return not _FOLLOW_UP_RE.search(key)
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a cached response by exact key.
+
+        Args:
+            key: Normalized query
+
+        Returns:
+            Cached response, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def embed(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Embed normalized queries for semantic lookup in a single batch.
+
+        Semantic lookup is disabled for the rest of the session if the embedding
+        model is unavailable.
+
+        Args:
+            keys: Normalized queries
+
+        Returns:
+            Unit-length embeddings, or Nones if semantic lookup is disabled
+        """
+        if not keys or not self.semantic_lookup:
+            return [None] * len(keys)
+        try:
+            embeddings = await embed_texts(self.client, self.embed_model_id, keys)
+        except Exception as e:
+            self.logger.warning(
+                "Disabling semantic query cache, embedding failed: %s", e
+            )
+            self.semantic_lookup = False
+            return [None] * len(keys)
+        return list(embeddings)
+
+    def search(self, embedding: Optional[np.ndarray]) -> Optional[str]:
+        """Look up a cached response by embedding similarity.
+
+        Args:
+            embedding: Unit-length query embedding
+
+        Returns:
+            Response of the most similar cached query above the threshold, or None
+        """
+        if embedding is None:
+            return None
+        if self._matrix is None:
+            # Rebuild the (N, d) key matrix after the cache has changed
+            self._keys, vectors = [], []
+            for key, (key_embedding, _) in self._entries.items():
+                if key_embedding is not None:
+                    self._keys.append(key)
+                    vectors.append(key_embedding)
+            if not vectors:
+                return None
+            self._matrix = np.stack(vectors)
+
+        scores = self._matrix @ embedding
+        best = int(np.argmax(scores))
+        if scores[best] <= self.threshold:
+            return None
+        return self.get(self._keys[best])
+
+    def put(self, key: str, embedding: Optional[np.ndarray], response: str) -> None:
+        """Add a response to the cache, evicting the least recently used entry.
+
+        Args:
+            key: Normalized query
+            embedding: Unit-length query embedding, if available
+            response: Formatted agent response
+        """
+        self._entries[key] = (embedding, response)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        self._matrix = None
+
+
+# Select the tools relevant to each query
+class ToolRetriever:
+    """Selects the tools most relevant to a query by embedding similarity.
+
+    Tool names and descriptions are embedded once, on first use, into an (N, d)
+    matrix, so each query is scored against every tool with a single
+    matrix-vector product. Only the selected tools are sent to the model,
+    reducing prompt tokens on every inference.
+    """
+
+    def __init__(
+        self,
+        tools: List[Any],
+        embed_model_id: str,
+        client: ollama.AsyncClient,
+        logger: logging.Logger,
+        top_k: int = 3,
+        pinned_tools: Tuple[str, ...] = ("current_time",),
+    ):
+        self.tools = tools
+        self.embed_model_id = embed_model_id
+        self.logger = logger
+        self.top_k = top_k
+        self.client = client
+        self.enabled = True
+        self._pinned = [i for i, t in enumerate(tools) if t.tool_name in pinned_tools]
+        self._candidates = [i for i in range(len(tools)) if i not in self._pinned]
+        self._matrix: Optional[np.ndarray] = None
+
+    async def select(self, embedding: Optional[np.ndarray]) -> List[Any]:
+        """Select the pinned tools plus the top-K tools for a query.
+
+        Args:
+            embedding: Unit-length query embedding, if available
+
+        Returns:
+            Selected tools, or all tools if the query cannot be ranked
+        """
+        if embedding is None or not self.enabled:
+            return self.tools
+        if len(self._candidates) <= self.top_k:
+            return self.tools
+
+        if self._matrix is None:
+            descriptions = [
+                f"{self.tools[i].tool_name}: {self.tools[i].tool_spec['description']}"
+                for i in self._candidates
+            ]
+            try:
+                self._matrix = await embed_texts(
+                    self.client, self.embed_model_id, descriptions
+                )
+            except Exception as e:
+                self.logger.warning("Disabling tool retrieval, embedding failed: %s", e)
+                self.enabled = False
+                return self.tools
+
+        scores = self._matrix @ embedding
+        ranked = np.argsort(-scores)[: self.top_k]
+        selected = set(self._pinned) | {self._candidates[int(j)] for j in ranked}
+        tools = [tool for i, tool in enumerate(self.tools) if i in selected]
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Selected tools: %s", [tool.tool_name for tool in tools])
+        return tools
+
+
+# Read user input without blocking the event loop
+async def ainput(prompt: str) -> str:
+    """Read a line of user input on a background thread.
+
+    A daemon thread is used instead of the default executor so readline editing
+    and history keep working, and a pending read never blocks shutdown.
+
+    Args:
+        prompt: Prompt to display
+
+    Returns:
+        User's input string
+    """
+    loop = asyncio.get_running_loop()
+    future: asyncio.Future[str] = loop.create_future()
+
+    def read_line() -> None:
+        try:
+            line = input(prompt)
+        except Exception as e:
+            loop.call_soon_threadsafe(future.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(future.set_result, line)
+
+    threading.Thread(target=read_line, daemon=True).start()
+    return await future
+
+
+# Bind the tools available to the agent's next invocation
+def bind_tools(agent: Agent, tools: List[Any]) -> None:
+    """Replace the agent's tool registry with the given tools.
+
+    The model is only sent the specs of tools in the registry, so binding a
+    subset of tools per query keeps the prompt small.
+
+    Args:
+        agent: The configured Agent instance
+        tools: Tools to make available
+    """
+    registry = _imports().ToolRegistry()
+    registry.process_tools(tools)
+    agent.tool_registry = registry
+
+
+# Fork the agent for a single concurrent sub-query
+def fork_agent(agent: Agent, tools: List[Any]) -> Agent:
+    """Create a short-lived copy of the agent sharing its model.
+
+    An Agent instance cannot be invoked concurrently, so each sub-query runs on
+    its own fork, seeded with a copy of the current conversation history.
+
+    Args:
+        agent: The configured Agent instance
+        tools: Tools to make available to the fork
+
+    Returns:
+        Forked Agent instance
+    """
+    lib = _imports()
+    fork: Agent = lib.Agent(
+        system_prompt=agent.system_prompt,
+        model=agent.model,
+        tools=tools,
+        messages=copy.deepcopy(agent.messages),
+        conversation_manager=lib.NullConversationManager(),
+        callback_handler=None,
+    )
+
+    # Share hook callbacks, such as tool cache invalidation, with the fork
+    fork.hooks = agent.hooks
+    return fork
+
+
+# Invoke the agent, streaming its response text
+async def stream_agent(agent: Agent, query: str, stream: ResponseStream) -> AgentResult:
+    """Invoke the agent, writing response text to the stream as it is generated.
+
+    Args:
+        agent: The configured Agent instance
+        query: Query to answer
+        stream: Stream to write response text to
+
+    Returns:
+        Agent result
+
+    Raises:
+        RuntimeError: If the agent finishes without a result
+    """
+    result: Optional[AgentResult] = None
+    async for event in agent.stream_async(query):
+        if "data" in event:
+            stream.write(event["data"])
+        elif "message" in event:
+            stream.end_message()
+        elif "result" in event:
+            result = event["result"]
+
+    if result is None:
+        raise RuntimeError("Agent stream ended without a result")
+    return result
+
+
+# Answer one or more sub-queries
+async def answer_queries(
+    agent: Agent,
+    queries: List[str],
+    tool_sets: List[List[Any]],
+    stream: Optional[ResponseStream] = None,
+) -> List[AgentResult]:
+    """Invoke the agent for each sub-query, running them concurrently.
+
+    Concurrent sub-queries overlap MCP tool calls with Ollama inference. Their
+    turns are merged back into the agent's conversation history in order.
+
+    Args:
+        agent: The configured Agent instance
+        queries: Sub-queries to answer
+        tool_sets: Tools to make available for each sub-query
+        stream: Stream for the response text of a single query, if any
+
+    Returns:
+        Agent results, in the same order as the queries
+    """
+    if len(queries) == 1:
+        bind_tools(agent, tool_sets[0])
+        if stream is not None:
+            return [await stream_agent(agent, queries[0], stream)]
+        return [await agent.invoke_async(queries[0])]
+
+    history_length = len(agent.messages)
+    forks = [fork_agent(agent, tools) for tools in tool_sets]
+    results = await asyncio.gather(
+        *(fork.invoke_async(query) for fork, query in zip(forks, queries))
+    )
+
+    for fork in forks:
+        agent.messages.extend(fork.messages[history_length:])
+    agent.conversation_manager.apply_management(agent)
+
+    return list(results)
+
+
+# Answer sub-queries from the query cache or the agent
+async def get_responses(
+    agent: Agent,
+    queries: List[str],
+    cache: QueryCache,
+    retriever: ToolRetriever,
+    logger: logging.Logger,
+    stream: Optional[ResponseStream] = None,
+) -> List[str]:
+    """Answer each sub-query, only invoking the agent on cache misses.
+
+    Args:
+        agent: The configured Agent instance
+        queries: Sub-queries to answer
+        cache: Query cache for repeated or similar queries
+        retriever: Tool retriever for selecting tools per sub-query
+        logger: Logger instance for logging
+        stream: Stream for the agent's response text when answering a single
+            query; concurrent sub-queries are not streamed
+
+    Returns:
+        Formatted responses, in the same order as the queries
+    """
+    keys = [cache.normalize(query) for query in queries]
+    cacheable = [cache.cacheable(key) for key in keys]
+    responses = [
+        cache.get(key) if is_cacheable else None
+        for key, is_cacheable in zip(keys, cacheable)
+    ]
+    embeddings: List[Optional[np.ndarray]] = [None] * len(queries)
+
+    # Embed exact-match misses and fall back to semantic lookup
+    misses = [i for i, response in enumerate(responses) if response is None]
+    miss_embeddings = await cache.embed([keys[i] for i in misses])
+    for i, embedding in zip(misses, miss_embeddings):
+        embeddings[i] = embedding
+        if cacheable[i]:
+            responses[i] = cache.search(embedding)
+
+    # Keep cache hits in the conversation history for follow-up questions
+    for query, response in zip(queries, responses):
+        if response is not None:
+            logger.info("Query cache hit: %r", query)
+            agent.messages.append({"role": "user", "content": [{"text": query}]})
+            agent.messages.append(
+                {"role": "assistant", "content": [{"text": response}]}
+            )
+
+    misses = [i for i, response in enumerate(responses) if response is None]
+    if misses:
+        # Reuse the cache embeddings to select tools for each sub-query
+        tool_sets = await asyncio.gather(
+            *(retriever.select(embeddings[i]) for i in misses)
+        )
+        results = await answer_queries(
+            agent,
+            [queries[i] for i in misses],
+            list(tool_sets),
+            stream if len(queries) == 1 else None,
+        )
+        for i, result in zip(misses, results):
+            formatted_response = format_response(result, logger)
+            responses[i] = formatted_response
+            if result.stop_reason == "end_turn" and cacheable[i]:
+                cache.put(keys[i], embeddings[i], formatted_response)
+
+            # Log metrics lazily, so repr only runs if the record is emitted
+            logger.info("Agent metrics: %r", result.metrics)
+
+    return [response or "" for response in responses]
+
+
+# Prompts that can be answered from the conversation alone: short greetings and
+# thanks, or questions about earlier turns
+_GREETING_RE = re.compile(
+    r"^(?:hi|hello|hey|thanks|thank you|ok|okay|great|cool)"
+    r"(?:[\s,]+(?:there|you|so much|a lot))?[\s!.]*$",
+    re.IGNORECASE,
+)
+_CONVERSATION_RE = re.compile(
+    r"^(?:what did (?:i|you) (?:just )?(?:ask|say)"
+    r"|repeat (?:that|your (?:last )?answer)"
+    r"|summarize (?:that|this conversation|our conversation|your (?:last )?answer))"
+    r"[\s?.!]*$",
+    re.IGNORECASE,
+)
+
+
+# Decide whether a prompt needs the agent and its tools
+def needs_tools(query: str) -> bool:
+    """Check whether a prompt may need a web search or other tool call.
+
+    Args:
+        query: Processed user input
+
+    Returns:
+        False for greetings, thanks, and questions about earlier turns
+    """
+    return not (_GREETING_RE.match(query) or _CONVERSATION_RE.match(query))
+
+
+# Answer a prompt with a single model call
+async def answer_directly(
+    agent: Agent,
+    client: ollama.AsyncClient,
+    query: str,
+    stream: Optional[ResponseStream] = None,
+) -> str:
+    """Answer a prompt with one streamed chat request to Ollama, without tools.
+
+    This skips the agent loop, and its tool-selection round-trips, for prompts
+    that only need the conversation so far. The turn is added to the agent's
+    conversation history.
+
+    Args:
+        agent: The configured Agent instance
+        client: Ollama client
+        query: Prompt to answer
+        stream: Stream to write response text to, if any
+
+    Returns:
+        Formatted response string
+    """
+    messages = agent.messages + [{"role": "user", "content": [{"text": query}]}]
+    model = cast("OllamaModel", agent.model)
+    request = model.format_request(messages, None, agent.system_prompt)
+
+    chunks = []
+    async for chunk in await client.chat(**request):
+        text = chunk.message.content or ""
+        chunks.append(text)
+        if stream is not None:
+            stream.write(text)
+    if stream is not None:
+        stream.end_message()
+
+    response_text = "".join(chunks)
+    agent.messages.extend(
+        [
+            {"role": "user", "content": [{"text": query}]},
+            {"role": "assistant", "content": [{"text": response_text}]},
+        ]
+    )
+    agent.conversation_manager.apply_management(agent)
+    return _THINK_RE.sub("", response_text)
+
+
+# Check whether an error was caused by a failed connection
+def is_connection_error(error: Optional[BaseException]) -> bool:
+    """Check an error and its causes for a connection error.
+
+    The Ollama client raises ConnectionError when it cannot connect, and the
+    Strands event loop wraps it in an EventLoopException.
+
+    Args:
+        error: Raised exception
+
+    Returns:
+        True if the error or any of its causes is a connection error
+    """
+    while error is not None:
+        if isinstance(error, (ConnectionError, httpx.ConnectError)):
+            return True
+        error = error.__cause__
+    return False
+
+
+# Retry requests to Ollama while it is unreachable
+class OllamaBackoff:
+    """Retries requests with exponential backoff on connection errors.
+
+    Other errors are raised immediately, as are connection errors once the
+    request can no longer be safely repeated. After a connection failure,
+    requests within the fail-fast window are tried once without retries, so a
+    prompt entered while Ollama is down fails in well under a second instead of
+    waiting through the backoff again.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        attempts: int = 3,
+        base_delay: float = 0.25,
+        fail_fast_window: float = 2.0,
+    ):
+        self.logger = logger
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.fail_fast_window = fail_fast_window
+        self._last_failure = float("-inf")
+
+    async def run(
+        self,
+        request: Callable[[], Awaitable[T]],
+        on_failure: Optional[Callable[[], None]] = None,
+        can_retry: Optional[Callable[[], bool]] = None,
+    ) -> T:
+        """Run a request, retrying it on connection errors.
+
+        Args:
+            request: Function that starts the request
+            on_failure: Called after each failed attempt, to undo partial state
+            can_retry: Called after a failed attempt, returning False if the
+                request had side effects and must not be repeated
+
+        Returns:
+            Result of the request
+
+        Raises:
+            ConnectionError: If every attempt failed to connect
+        """
+        recently_failed = time.monotonic() - self._last_failure < self.fail_fast_window
+        attempts = 1 if recently_failed else self.attempts
+
+        attempt = 0
+        while True:
+            try:
+                return await request()
+            except Exception as e:
+                if on_failure is not None:
+                    on_failure()
+                if not is_connection_error(e):
+                    raise
+                self._last_failure = time.monotonic()
+                attempt += 1
+                if attempt == attempts or (can_retry is not None and not can_retry()):
+                    if isinstance(e, ConnectionError):
+                        raise
+                    raise ConnectionError(str(e)) from e
+
+                delay = self.base_delay * 2 ** (attempt - 1)
+                self.logger.warning(
+                    "Connection to Ollama failed, retrying in %.2fs: %s", delay, e
+                )
+                await asyncio.sleep(delay)
+
+
 # Main interactive loop
-def run_interactive_loop(agent: Agent, logger: logging.Logger) -> None:
+async def run_interactive_loop(
+    agent: Agent,
+    client: ollama.AsyncClient,
+    cache: QueryCache,
+    retriever: ToolRetriever,
+    backoff: OllamaBackoff,
+    logger: logging.Logger,
+) -> None:
     """Run the main interactive loop for the agent.
 
     Args:
         agent: The configured Agent instance
+        client: Ollama client for prompts answered without tools
+        cache: Query cache for repeated or similar queries
+        retriever: Tool retriever for selecting tools per sub-query
+        backoff: Retry policy for connection errors to Ollama
         logger: Logger instance for logging
     """
-    print(
-        f"{TermColors.BLUE}Welcome to the Tavily MCP Server Search Agent!{TermColors.RESET}"
-    )
-    print(
-        f"{TermColors.BLUE}Type 'exit' or 'quit' to end the session.{TermColors.RESET}"
-    )
+    sys.stdout.write(WELCOME_STR)
+
+    # Count tool calls, so a failed turn is only retried if no tool has run
+    tool_calls = 0
+
+    def count_tool_call(event: BeforeToolCallEvent) -> None:
+        nonlocal tool_calls
+        tool_calls += 1
+
+    # Forks share the agent's hooks, so concurrent sub-queries are counted too
+    agent.hooks.add_callback(_imports().BeforeToolCallEvent, count_tool_call)
 
     while True:
         try:
-            user_input = input(f"\n{TermColors.BLUE}> {TermColors.RESET}")
+            user_input = await ainput(PROMPT_STR)
+            add_history(user_input)
             processed_input = process_input(user_input)
 
             # Check if user wants to exit
-            if processed_input is False:
-                print(f"\n{TermColors.BLUE}Goodbye! 👋{TermColors.RESET}")
+            if processed_input is None:
+                sys.stdout.write(GOODBYE_STR)
                 break
 
-            # Get response from agent
-            response = agent(processed_input)
-            formatted_response = format_response(response, logger)
+            # Re-prompt on blank input rather than invoking the agent
+            if not processed_input:
+                continue
+
+            # Get responses, answering compound input concurrently
+            queries = split_subqueries(processed_input)
+            stream = ResponseStream()
+            # Snapshot the history, since Strands may trim it after a failure
+            saved_messages = list(agent.messages)
+            turn_tool_calls = tool_calls
+
+            async def answer() -> List[str]:
+                if len(queries) == 1 and not needs_tools(queries[0]):
+                    # Answer from the conversation, bypassing the cache and tools
+                    logger.info("Answering without tools: %r", queries[0])
+                    return [await answer_directly(agent, client, queries[0], stream)]
+                return await get_responses(
+                    agent, queries, cache, retriever, logger, stream
+                )
 
-            # Display response
-            print(f"\n{TermColors.GREEN}{formatted_response}{TermColors.RESET}")
+            def rollback() -> None:
+                # Drop the failed turn, so a retry does not repeat the prompt
+                agent.messages[:] = saved_messages
 
-            # Log metrics at debug level using repr for complex objects
-            logger.info(f"Agent metrics: {repr(response.metrics)}")
+            def can_retry() -> bool:
+                # Replaying the turn would re-run tools or repeat streamed text
+                return not stream.started and tool_calls == turn_tool_calls
+
+            try:
+                responses = await backoff.run(
+                    answer, on_failure=rollback, can_retry=can_retry
+                )
+            finally:
+                stream.close()
+
+            # Display responses that were not streamed, in a single write
+            if not stream.started:
+                sys.stdout.write(
+                    "".join(
+                        RESPONSE_START + formatted_response + RESPONSE_END
+                        for formatted_response in responses
+                    )
+                )
+                sys.stdout.flush()
 
         except KeyboardInterrupt:
-            print(
-                f"\n\n{TermColors.YELLOW}Execution interrupted. Exiting...{TermColors.RESET}"
-            )
+            sys.stdout.write(INTERRUPTED_STR)
             break
         # Group related exceptions together with more pythonic error handling
         except (ConnectionError, ValueError) as e:
-            error_type = "Connection" if isinstance(e, ConnectionError) else "Value"
-            print(f"\n{TermColors.RED}{error_type} error: {e!s}{TermColors.RESET}")
-
             if isinstance(e, ConnectionError):
-                print(
-                    f"{TermColors.RED}Check if Ollama is running and try again.{TermColors.RESET}"
+                sys.stdout.write(
+                    f"{ERROR_PREFIX}Connection error: {e!s}{CONNECTION_HINT_STR}"
                 )
             else:
-                print(
-                    f"{TermColors.RED}Please check your input and try again.{TermColors.RESET}"
-                )
+                sys.stdout.write(f"{ERROR_PREFIX}Value error: {e!s}{VALUE_HINT_STR}")
         except Exception as e:
-            print(f"\n{TermColors.RED}An error occurred: {e!s}{TermColors.RESET}")
-            print(f"{TermColors.RED}Please try a different request.{TermColors.RESET}")
-            # Use !r format specifier for better error representation
-            logger.error(f"Unexpected error: {e!r}", exc_info=True)
+            sys.stdout.write(
+                f"{ERROR_PREFIX}An error occurred: {e!s}{UNEXPECTED_HINT_STR}"
+            )
+            # Use %r for better error representation
+            logger.error("Unexpected error: %r", e, exc_info=True)
 
 
 # Configure readline for proper input handling
@@ -266,27 +1458,66 @@ def configure_readline() -> None:
     print(f"History file: {history_file}")
     try:
         readline.read_history_file(history_file)
-        # Default history length
-        readline.set_history_length(1000)
     except FileNotFoundError:
-        pass
+        # append_history_file requires an existing file
+        open(history_file, "wb").close()
+    readline.set_history_length(HISTORY_LENGTH)
+    loaded_length = readline.get_current_history_length()
+
+    # Lines are added by add_history, skipping consecutive duplicates
+    readline.set_auto_history(False)
+
+    def save_history() -> None:
+        if loaded_length > HISTORY_LENGTH:
+            # Rewrite the file only when it has grown past the limit
+            readline.write_history_file(history_file)
+            return
+        new_lines = readline.get_current_history_length() - loaded_length
+        if new_lines > 0:
+            readline.append_history_file(new_lines, history_file)
+
+    # Append this session's history on exit (atexit already imported at the top)
+    atexit.register(save_history)
+
+
+# Add user input to the readline history
+def add_history(line: str) -> None:
+    """Add a line to the readline history, skipping blanks and repeats.
 
-    # Save history on exit (atexit already imported at the top)
-    atexit.register(readline.write_history_file, history_file)
+    Args:
+        line: User's input string
+    """
+    if not line.strip():
+        return
+    length = readline.get_current_history_length()
+    if length and readline.get_history_item(length) == line:
+        return
+    readline.add_history(line)
 
 
 # Context manager for agent session
 class AgentSession:
     """Context manager for handling the agent session lifecycle."""
 
-    def __init__(self, model: OllamaModel, api_key: str, logger: logging.Logger):
+    def __init__(
+        self,
+        model: OllamaModel,
+        api_key: str,
+        logger: logging.Logger,
+        window_size: int = 8,
+        token_budget: int = 4096,
+    ):
         self.model = model
         self.api_key = api_key
         self.logger = logger
+        self.window_size = window_size
+        self.token_budget = token_budget
         self.mcp_client: Optional[MCPClient] = None
         self.agent: Optional[Agent] = None
 
     def __enter__(self) -> Agent:
+        lib = _imports()
+
         # Initialize MCP client
         self.mcp_client = initialize_mcp_client(self.api_key)
 
@@ -294,7 +1525,9 @@ class AgentSession:
         self.mcp_client.__enter__()
 
         # Create a conversation manager
-        conversation_manager = SlidingWindowConversationManager(window_size=20)
+        conversation_manager = token_budget_conversation_manager()(
+            window_size=self.window_size, token_budget=self.token_budget
+        )
 
         # Define system prompt
         system_prompt = """Get the latest date and time before starting starting your answer.
@@ -307,21 +1540,95 @@ You are a expert research assistant that can search the internet to provide info
         4. Cite your sources when providing information from the web.
         5. Always respond in markdown format for better readability."""
 
-        # Create an agent with tools
-        tools = [current_time, shell, self.mcp_client.list_tools_sync()]
-
-        self.agent = Agent(
+        # Create an agent with tools, reusing the cached MCP tool list if fresh
+        cache_key = hashlib.sha256(
+            (TAVILY_MCP_URL + self.api_key).encode()
+        ).hexdigest()[:16]
+        mcp_tools = self._load_cached_tools(cache_key)
+        if mcp_tools is None:
+            mcp_tools = self.mcp_client.list_tools_sync()
+            self._save_cached_tools(cache_key, mcp_tools)
+        tools = [lib.current_time, lib.shell, mcp_tools]
+
+        self.agent = lib.Agent(
             system_prompt=system_prompt,
             model=self.model,
             tools=tools,
             conversation_manager=conversation_manager,
+            # Response text is streamed by the interactive loop instead
+            callback_handler=None,
         )
 
         if not self.agent:
             raise RuntimeError("Failed to initialize agent")
 
+        # Drop the cached tool list if an MCP tool call fails
+        self.agent.hooks.add_callback(
+            lib.AfterToolCallEvent, self._invalidate_cached_tools
+        )
+
         return self.agent
 
+    def _load_cached_tools(self, cache_key: str) -> Optional[List[MCPAgentTool]]:
+        """Load the MCP tool list from the on-disk cache.
+
+        Args:
+            cache_key: Hash of the MCP server URL and API key
+
+        Returns:
+            Cached MCP tools, or None if the cache is missing, stale, or invalid
+        """
+        if self.mcp_client is None:
+            return None
+        try:
+            if os.path.getmtime(TOOLS_CACHE_FILE) < time.time() - TOOLS_CACHE_TTL:
+                return None
+            with open(TOOLS_CACHE_FILE, encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache.get("key") != cache_key:
+                return None
+            lib = _imports()
+            return [
+                lib.MCPAgentTool(lib.MCPTool.model_validate(tool), self.mcp_client)
+                for tool in cache["tools"]
+            ]
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.debug("Tool cache unavailable: %s", e)
+            return None
+
+    def _save_cached_tools(self, cache_key: str, tools: List[MCPAgentTool]) -> None:
+        """Save the MCP tool list to the on-disk cache.
+
+        Args:
+            cache_key: Hash of the MCP server URL and API key
+            tools: MCP tools to cache
+        """
+        cache = {
+            "key": cache_key,
+            "tools": [tool.mcp_tool.model_dump(mode="json") for tool in tools],
+        }
+        try:
+            with open(TOOLS_CACHE_FILE, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+        except OSError as e:
+            self.logger.warning("Failed to save tool cache: %s", e)
+
+    def _invalidate_cached_tools(self, event: AfterToolCallEvent) -> None:
+        """Delete the on-disk tool cache after a failed MCP tool call.
+
+        Args:
+            event: Event fired after each tool call
+        """
+        if not isinstance(event.selected_tool, _imports().MCPAgentTool):
+            return
+        if event.exception is None and event.result.get("status") != "error":
+            return
+        try:
+            os.remove(TOOLS_CACHE_FILE)
+            self.logger.info("Invalidated tool cache after failed MCP tool call")
+        except FileNotFoundError:
+            pass
+
     def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
         if self.mcp_client:
             self.mcp_client.__exit__(exc_type, exc_val, exc_tb)
@@ -329,7 +1636,7 @@ You are a expert research assistant that can search the internet to provide info
 
 # Main function
 def main() -> None:
-    """Main entry point of the application."""                                              
+    """Main entry point of the application."""
     # Setup signal handlers for graceful shutdown
     setup_signal_handlers()
 
@@ -343,20 +1650,61 @@ def main() -> None:
         # Load environment variables
         env = load_environment_variables()
 
+        # Share one pool of keep-alive connections across all Ollama clients
+        transport = create_ollama_transport()
+        ollama_client = ollama.AsyncClient(host=env.OLLAMA_HOST, transport=transport)
+
         # Initialize model
         model = initialize_model(
-            env["MODEL_ID"], env["TEMPERATURE"], env["OLLAMA_HOST"], env["KEEP_ALIVE"]
+            env.MODEL_ID,
+            env.TEMPERATURE,
+            env.OLLAMA_HOST,
+            env.KEEP_ALIVE,
+            num_ctx=env.NUM_CTX,
+            num_batch=env.NUM_BATCH,
+            transport=transport,
         )
 
-        logger.debug(f"Model configuration: {repr(model.config)}")
+        logger.debug("Model configuration: %r", model.config)
+
+        # Load the model while the rest of the session starts up
+        warmup_model(model, env.OLLAMA_HOST, logger)
+
+        # Cache responses for repeated or similar queries
+        cache = QueryCache(env.EMBED_MODEL_ID, ollama_client, logger)
 
         # Use context manager for agent session
-        with AgentSession(model, env["TAVILY_API_KEY"], logger) as agent:
+        with AgentSession(
+            model,
+            env.TAVILY_API_KEY,
+            logger,
+            window_size=env.CONV_WINDOW_SIZE,
+            token_budget=env.CONV_TOKEN_BUDGET,
+        ) as agent:
+            # Select a subset of the agent's tools for each query
+            retriever = ToolRetriever(
+                list(agent.tool_registry.registry.values()),
+                env.EMBED_MODEL_ID,
+                ollama_client,
+                logger,
+                top_k=env.TOOL_TOP_K,
+            )
+
+            # Retry turns while Ollama is briefly unreachable
+            backoff = OllamaBackoff(logger)
+
+            async def run() -> None:
+                # Close the pooled Ollama connections when the loop ends
+                async with ollama_client:
+                    await run_interactive_loop(
+                        agent, ollama_client, cache, retriever, backoff, logger
+                    )
+
             # Run the interactive loop
-            run_interactive_loop(agent, logger)
+            asyncio.run(run())
 
     except Exception as e:
-        logger.critical(f"Fatal error: {e!r}", exc_info=True)
+        logger.critical("Fatal error: %r", e, exc_info=True)
         print(f"{TermColors.RED}Fatal error: {e!s}{TermColors.RESET}")
         sys.exit(1)
 